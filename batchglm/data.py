@@ -1,9 +1,12 @@
+import functools
 import logging
 import patsy
 import pandas as pd
 import numpy as np
 from typing import Union, Tuple, List
 
+from .utils.linalg import unique_rows
+
 try:
     import anndata
     try:
@@ -15,6 +18,42 @@ except ImportError:
     Raw = None
 
 
+@functools.lru_cache(maxsize=128)
+def _model_desc_from_formula(formula: str) -> patsy.ModelDesc:
+    """
+    Parse a model formula into a patsy.ModelDesc.
+
+    Results are cached so that formulas which are used repeatedly are only parsed once.
+
+    :param formula: model formula as string, e.g. '~ 1 + batch + confounder'
+    :return: patsy model description of the formula
+    """
+    return patsy.ModelDesc.from_formula(formula)
+
+
+def _as_categorical(
+        sample_description: pd.DataFrame,
+        as_categorical: Union[bool, list] = True
+) -> pd.DataFrame:
+    """
+    Convert the selected columns of a sample description to categorical columns.
+
+    All selected columns are converted in a single astype() call. The input is not modified and only copied if
+    at least one column is converted.
+
+    :param sample_description: pandas.DataFrame of length "num_observations" containing explanatory variables as columns
+    :param as_categorical: boolean or list of booleans corresponding to the columns in 'sample_description'
+    :return: sample description with the selected columns converted to categorical columns
+    """
+    if type(as_categorical) is bool:
+        as_categorical = np.repeat(as_categorical, sample_description.columns.size)
+
+    to_cat = {col: "category" for is_cat, col in zip(as_categorical, sample_description) if is_cat}
+    if len(to_cat) > 0:
+        sample_description = sample_description.astype(to_cat)
+    return sample_description
+
+
 def design_matrix(
         sample_description: Union[pd.DataFrame, None] = None,
         formula: Union[str, None] = None,
@@ -51,16 +90,10 @@ def design_matrix(
         raise ValueError("supply either dmat or sample_description")
 
     if dmat is None:
-        sample_description: pd.DataFrame = sample_description.copy()
-
-        if type(as_categorical) is not bool or as_categorical:
-            if type(as_categorical) is bool and as_categorical:
-                as_categorical = np.repeat(True, sample_description.columns.size)
-
-            for to_cat, col in zip(as_categorical, sample_description):
-                if to_cat:
-                    sample_description[col] = sample_description[col].astype("category")
-
+        sample_description = _as_categorical(sample_description=sample_description, as_categorical=as_categorical)
+        # Only formula strings are parsed here, other formula-likes are handed to patsy as they are.
+        if isinstance(formula, str):
+            formula = _model_desc_from_formula(formula)
         dmat = patsy.dmatrix(formula, sample_description)
         coef_names = dmat.design_info.column_names
 
@@ -244,18 +277,22 @@ def constraint_system_from_star(
     else:
         raise ValueError("constraint format %s not recognized" % type(constraints))
 
-    # Test full design matrix for being full rank before returning:
+    # Test full design matrix for being full rank before returning.
+    # Duplicated observations do not change the rank, so only the unique rows of the design matrix are tested.
+    dmat_unique, _ = unique_rows(np.asarray(dmat))
     if cmat is None:
-        if np.linalg.matrix_rank(dmat) != dmat.shape[1]:
+        rank = np.linalg.matrix_rank(dmat_unique)
+        if rank != dmat.shape[1]:
             raise ValueError(
                 "constrained design matrix is not full rank: %i %i" %
-                (np.linalg.matrix_rank(dmat), dmat.shape[1])
+                (rank, dmat.shape[1])
             )
     else:
-        if np.linalg.matrix_rank(np.matmul(dmat, cmat)) != cmat.shape[1]:
+        rank = np.linalg.matrix_rank(np.matmul(dmat_unique, cmat))
+        if rank != cmat.shape[1]:
             raise ValueError(
                 "constrained design matrix is not full rank: %i %i" %
-                (np.linalg.matrix_rank(np.matmul(dmat, cmat)), cmat.shape[1])
+                (rank, cmat.shape[1])
             )
 
     return dmat, coef_names, cmat, term_names
@@ -307,15 +344,7 @@ def constraint_matrix_from_dict(
         - term_names to allow slicing by factor if return type cannot be patsy.DesignMatrix
     """
     assert len(constraints) > 0, "supply constraints"
-    sample_description: pd.DataFrame = sample_description.copy()
-
-    if type(as_categorical) is not bool or as_categorical:
-        if type(as_categorical) is bool and as_categorical:
-            as_categorical = np.repeat(True, sample_description.columns.size)
-
-        for to_cat, col in zip(as_categorical, sample_description):
-            if to_cat:
-                sample_description[col] = sample_description[col].astype("category")
+    sample_description = _as_categorical(sample_description=sample_description, as_categorical=as_categorical)
 
     # Build core design matrix on unconstrained factors. Then add design matrices without
     # absorption of the first level of each factor for each constrained factor onto the
@@ -323,7 +352,7 @@ def constraint_matrix_from_dict(
     formula_unconstrained = formula.split("+")
     formula_unconstrained = [x for x in formula_unconstrained if x.strip(" ") not in constraints.keys()]
     formula_unconstrained = "+".join(formula_unconstrained)
-    dmat = patsy.dmatrix(formula_unconstrained, sample_description)
+    dmat = patsy.dmatrix(_model_desc_from_formula(formula_unconstrained), sample_description)
     coef_names = dmat.design_info.column_names
     term_names = dmat.design_info.term_names
 
@@ -333,7 +362,7 @@ def constraint_matrix_from_dict(
     )
     for i, x in enumerate(constraints.keys()):
         assert isinstance(x, str), "constrained should contain strings"
-        dmat_constrained_temp = patsy.highlevel.dmatrix("0+" + x, sample_description)
+        dmat_constrained_temp = patsy.highlevel.dmatrix(_model_desc_from_formula("0+" + x), sample_description)
         dmat = np.hstack([dmat, dmat_constrained_temp])
         coef_names.extend(dmat_constrained_temp.design_info.column_names)
         term_names.extend(dmat_constrained_temp.design_info.term_names)
@@ -379,21 +408,25 @@ def string_constraints_from_dict(
         constraints_ls = []
         for i, x in enumerate(constraints.keys()):
             assert isinstance(x, str), "constrained should contain strings"
-            dmat_constrained_temp = patsy.highlevel.dmatrix("0+" + x, sample_description)
-
-            dmat_grouping_temp = patsy.highlevel.dmatrix("0+" + list(constraints.values())[i], sample_description)
-            for j in range(dmat_grouping_temp.shape[1]):
-                grouping = dmat_grouping_temp[:, j]
-                idx_constrained_group = np.where(np.sum(dmat_constrained_temp[grouping == 1, :], axis=0) > 0)[0]
-                # Assert that required grouping is nested.
-                assert np.all(np.logical_xor(
-                    np.sum(dmat_constrained_temp[grouping == 1, :], axis=0) > 0,
-                    np.sum(dmat_constrained_temp[grouping == 0, :], axis=0) > 0
-                )), "proposed grouping of constraints is not nested, read docstrings"
-                # Add new string-encoded equality constraint.
-                constraints_ls.append(
-                    "+".join(list(np.asarray(dmat_constrained_temp.design_info.column_names)[idx_constrained_group])) + "=0"
-                )
+            dmat_constrained_temp = patsy.highlevel.dmatrix(_model_desc_from_formula("0+" + x), sample_description)
+
+            dmat_grouping_temp = patsy.highlevel.dmatrix(
+                _model_desc_from_formula("0+" + list(constraints.values())[i]),
+                sample_description
+            )
+            coef_names_constrained = np.asarray(dmat_constrained_temp.design_info.column_names)
+            # Presence of each constrained level (columns) within and outside of each group (rows),
+            # evaluated for all groups at once.
+            dmat_grouping_temp = np.asarray(dmat_grouping_temp)
+            dmat_constrained_temp = np.asarray(dmat_constrained_temp)
+            in_group = np.matmul((dmat_grouping_temp == 1).T, dmat_constrained_temp) > 0
+            out_group = np.matmul((dmat_grouping_temp == 0).T, dmat_constrained_temp) > 0
+            # Assert that required grouping is nested.
+            assert np.all(np.logical_xor(in_group, out_group)), \
+                "proposed grouping of constraints is not nested, read docstrings"
+            # Add new string-encoded equality constraint for each group.
+            for in_group_j in in_group:
+                constraints_ls.append("+".join(list(coef_names_constrained[in_group_j])) + "=0")
 
         logging.getLogger("batchglm").warning("Built constraints: " + ", ".join(constraints_ls))
     else:
@@ -445,11 +478,13 @@ def constraint_matrix_from_string(
             constraint_mat[i, :] = 0
             constraint_mat[i, idx_unconstr_i] = 1
 
-    # Test unconstrained subset design matrix for being full rank before returning constraints:
-    if np.linalg.matrix_rank(dmat[:, idx_unconstr]) != np.linalg.matrix_rank(dmat[:, idx_unconstr].T):
+    # Test unconstrained subset design matrix for being full rank before returning constraints.
+    # Duplicated observations do not change the rank, so only the unique rows are tested.
+    rank = np.linalg.matrix_rank(unique_rows(np.asarray(dmat)[:, idx_unconstr])[0])
+    if rank != len(idx_unconstr):
         raise ValueError(
-            "unconstrained sub-design matrix is not full rank" %
-            np.linalg.matrix_rank(dmat[:, idx_unconstr]), np.linalg.matrix_rank(dmat[:, idx_unconstr].T)
+            "unconstrained sub-design matrix is not full rank: %i %i" %
+            (rank, len(idx_unconstr))
         )
 
     return constraint_mat
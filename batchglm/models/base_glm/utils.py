@@ -5,6 +5,7 @@ try:
 except ImportError:
     anndata = None
 
+import dask
 import dask.array
 import numpy as np
 import pandas as pd
@@ -82,6 +83,119 @@ def parse_constraints(
     return constraints, constraint_params
 
 
+def _divide_size_factors(
+        x: Union[np.ndarray, scipy.sparse.csr_matrix, dask.array.core.Array],
+        size_factors
+):
+    r"""
+    Divide each observation of `x` by its size factor.
+
+    Sparse input stays sparse: dividing a scipy.sparse matrix by a dense array would densify it.
+
+    :param x: The input data array (observations x features)
+    :param size_factors: size factors for X (observations x 1)
+    :return: x divided by size factors
+    """
+    if scipy.sparse.issparse(x):
+        if isinstance(size_factors, dask.array.core.Array):
+            size_factors = size_factors.compute()
+        return scipy.sparse.diags(1 / np.asarray(size_factors).ravel()).dot(x).tocsr()
+    return np.divide(x, size_factors)
+
+
+def _group_indicator(
+        x: Union[np.ndarray, scipy.sparse.csr_matrix, dask.array.core.Array],
+        grouping: np.ndarray
+):
+    r"""
+    Build the (groups x observations) one-hot indicator matrix of a grouping in a format that matches `x`.
+
+    :param x: The input data array
+    :param grouping: Group index of each observation, integers from 0 to the number of groups - 1.
+    :return: Tuple of indicator matrix and number of observations per group.
+    """
+    grouping = np.asarray(grouping).ravel()
+    counts = np.bincount(grouping)
+    # Accumulate group sums in floating point: integer count data would silently overflow otherwise.
+    dtype = np.result_type(x.dtype, np.float64)
+    if isinstance(x, dask.array.core.Array):
+        # Build the indicator lazily so that it is chunked along the observations in the same way as x.
+        grouping_dask = dask.array.from_array(grouping, chunks=(x.chunks[0],))
+        indicator = (grouping_dask[None, :] == np.arange(counts.shape[0])[:, None]).astype(dtype)
+    else:
+        indicator = scipy.sparse.csr_matrix(
+            (np.ones_like(grouping, dtype=dtype), (grouping, np.arange(grouping.shape[0]))),
+            shape=(counts.shape[0], grouping.shape[0])
+        )
+    return indicator, counts
+
+
+def _indicator_reduce(indicator, *xs) -> List[np.ndarray]:
+    r"""
+    Sum the observations of each array in `xs` within each group of a group indicator matrix.
+
+    Dask arrays are computed jointly so that their shared inputs are only read once.
+
+    :return: List of group-wise sums (groups x features), one per array in `xs`.
+    """
+    sums = [indicator @ x for x in xs]
+    sums = [
+        s.toarray() if scipy.sparse.issparse(s) else s
+        for s in dask.compute(*sums)
+    ]
+    return [np.asarray(s) for s in sums]
+
+
+def _groupwise_means(
+        x: Union[np.ndarray, scipy.sparse.csr_matrix, dask.array.core.Array],
+        grouping: np.ndarray
+) -> np.ndarray:
+    r"""
+    Calculates the mean of each group of observations in a single pass over `x`.
+
+    :param x: The input data array (observations x features)
+    :param grouping: Group index of each observation, integers from 0 to the number of groups - 1.
+    :return: Group-wise means (groups x features)
+    """
+    indicator, counts = _group_indicator(x=x, grouping=grouping)
+    sums, = _indicator_reduce(indicator, x)
+    return sums / np.expand_dims(counts, axis=-1)
+
+
+def _groupwise_moments(
+        x: Union[np.ndarray, scipy.sparse.csr_matrix, dask.array.core.Array],
+        grouping: np.ndarray,
+        groupwise_means: Union[np.ndarray, None] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    r"""
+    Calculates the first and second raw moments, E[x] and E[x^2], of each group of observations.
+
+    Both moments are reduced with the same group indicator in one sweep over `x`. If the group-wise means
+    are already known, only E[x^2] is reduced.
+
+    :param x: The input data array (observations x features)
+    :param grouping: Group index of each observation, integers from 0 to the number of groups - 1.
+    :param groupwise_means: optional, group-wise means (groups x features) if already computed
+    :return: tuple of group-wise means and group-wise means of squares (groups x features)
+    """
+    indicator, counts = _group_indicator(x=x, grouping=grouping)
+    counts = np.expand_dims(counts, axis=-1)
+    # Square in floating point: squares of integer count data overflow quickly.
+    if scipy.sparse.issparse(x):
+        x_sq = x.astype(np.float64).power(2)
+    elif isinstance(x, dask.array.core.Array):
+        # The dtype argument of np.square is not applied to chunks of sparse.COO, cast lazily instead.
+        x_sq = np.square(x.astype(np.float64))
+    else:
+        x_sq = np.square(x, dtype=np.float64)
+    if groupwise_means is None:
+        sums, sums_sq = _indicator_reduce(indicator, x, x_sq)
+        groupwise_means = sums / counts
+    else:
+        sums_sq, = _indicator_reduce(indicator, x_sq)
+    return groupwise_means, sums_sq / counts
+
+
 def closedform_glm_mean(
         x: Union[np.ndarray, scipy.sparse.csr_matrix],
         dmat: np.ndarray,
@@ -103,13 +217,10 @@ def closedform_glm_mean(
     :return: tuple: (groupwise_means, mu, rmsd)
     """
     if size_factors is not None:
-        x = np.divide(x, size_factors)
+        x = _divide_size_factors(x=x, size_factors=size_factors)
 
     def apply_fun(grouping):
-        groupwise_means = np.asarray(np.vstack([
-            np.mean(x[np.where(grouping == g)[0], :], axis=0)
-            for g in np.unique(grouping)
-        ]))
+        groupwise_means = _groupwise_means(x=x, grouping=grouping)
         if link_fn is None:
             return groupwise_means
         else:
@@ -146,30 +257,21 @@ def closedform_glm_scale(
     :return: tuple (groupwise_scales, logphi, rmsd)
     """
     if size_factors is not None:
-        x = x / size_factors
+        x = _divide_size_factors(x=x, size_factors=size_factors)
 
     # to circumvent nonlocal error
     provided_groupwise_means = groupwise_means
 
     def apply_fun(grouping):
-        # Calculate group-wise means if not supplied. These are required for variance and MME computation.
-        if provided_groupwise_means is None:
-            gw_means = np.asarray(np.vstack([
-                np.mean(x[np.where(grouping == g)[0], :], axis=0)
-                for g in np.unique(grouping)
-            ]))
-        else:
-            gw_means = provided_groupwise_means
-
-        # calculated variance via E(x)^2 or directly depending on whether `mu` was specified
-        if isinstance(x, scipy.sparse.csr_matrix):
-            expect_xsq = np.asarray(np.vstack([
-                np.asarray(np.mean(x[np.where(grouping == g)[0], :].power(2), axis=0))
-                for g in np.unique(grouping)]
-            ))
-        else:
-            expect_xsq = np.vstack([np.mean(np.square(x[np.where(grouping == g)[0], :]), axis=0)
-                                    for g in np.unique(grouping)])
+        # Calculate E(x^2) and, if not supplied, group-wise means in the same sweep.
+        # These are required for variance and MME computation.
+        gw_means, expect_xsq = _groupwise_moments(
+            x=x,
+            grouping=grouping,
+            groupwise_means=provided_groupwise_means
+        )
+
+        # calculated variance via E(x^2) - E(x)^2
         expect_x_sq = np.square(gw_means)
         variance = expect_xsq - expect_x_sq
 
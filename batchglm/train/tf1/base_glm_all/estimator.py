@@ -1,4 +1,5 @@
 import abc
+import dask.array
 from enum import Enum
 import logging
 import numpy as np
@@ -7,7 +8,7 @@ import tensorflow as tf
 from typing import Union
 
 from .estimator_graph import EstimatorGraphAll
-from .external import _TFEstimator, InputDataGLM, _EstimatorGLM
+from .external import _TFEstimator, InputDataGLM, _EstimatorGLM, unique_rows
 
 
 class TFEstimatorGLM(_TFEstimator, _EstimatorGLM, metaclass=abc.ABCMeta):
@@ -77,9 +78,9 @@ class TFEstimatorGLM(_TFEstimator, _EstimatorGLM, metaclass=abc.ABCMeta):
         self.noise_model = noise_model
 
         # validate design matrix:
-        if np.linalg.matrix_rank(input_data.design_loc) != np.linalg.matrix_rank(input_data.design_loc.T):
+        if not self._is_full_rank(dmat=input_data.design_loc, constraints=input_data.constraints_loc):
             raise ValueError("design_loc matrix is not full rank")
-        if np.linalg.matrix_rank(input_data.design_scale) != np.linalg.matrix_rank(input_data.design_scale.T):
+        if not self._is_full_rank(dmat=input_data.design_scale, constraints=input_data.constraints_scale):
             raise ValueError("design_scale matrix is not full rank")
 
         # ### initialization
@@ -191,6 +192,24 @@ class TFEstimatorGLM(_TFEstimator, _EstimatorGLM, metaclass=abc.ABCMeta):
             input_data=input_data
         )
 
+    @staticmethod
+    def _is_full_rank(dmat, constraints) -> bool:
+        r"""
+        Check whether a constrained design matrix identifies all independent parameters.
+
+        Duplicated observations do not change the rank, so only the unique rows of the design matrix are tested.
+
+        :param dmat: design matrix (observations x parameters)
+        :param constraints: tensor (all parameters x dependent parameters)
+        :return: True if <dmat, constraints> has full column rank.
+        """
+        if isinstance(dmat, dask.array.core.Array):  # matrix_rank not supported by dask
+            dmat = dmat.compute()
+        if isinstance(constraints, dask.array.core.Array):
+            constraints = constraints.compute()
+        unique_design, _ = unique_rows(np.asarray(dmat))
+        return np.linalg.matrix_rank(np.matmul(unique_design, constraints)) == constraints.shape[1]
+
     def _scaffold(self):
         with self.model.graph.as_default():
             scaffold = tf.compat.v1.train.Scaffold(
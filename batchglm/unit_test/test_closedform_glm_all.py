@@ -0,0 +1,166 @@
+import dask.array
+import logging
+import numpy as np
+import scipy.sparse
+import sparse
+import unittest
+
+import batchglm.api as glm
+from batchglm.models.base_glm.utils import closedform_glm_mean, closedform_glm_scale, _divide_size_factors
+
+glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class _TestClosedformGlmAll:
+    """
+    Test closed-form initialisations of GLM parameters across input data types.
+    """
+
+    def simulate(self):
+        np.random.seed(1)
+        self.x = np.random.poisson(lam=5, size=(300, 10)).astype(float)
+        self.dmat = np.zeros([300, 2])
+        self.dmat[:, 0] = 1
+        self.dmat[:100, 1] = 1
+        self.constraints = np.identity(2)
+        self.size_factors = np.random.uniform(0.5, 1.5, size=(300, 1))
+
+    def dask_inputs(self):
+        return [
+            dask.array.from_array(self.x, chunks=(70, 3)),
+            dask.array.from_array(sparse.COO.from_numpy(self.x), chunks=(70, 3), asarray=False)
+        ]
+
+
+class TestClosedformGlmMean(_TestClosedformGlmAll, unittest.TestCase):
+
+    def test_sparse_size_factors(self):
+        logger.error("TestClosedformGlmMean.test_sparse_size_factors()")
+
+        self.simulate()
+        x_sparse = scipy.sparse.csr_matrix(self.x)
+        x_divided = _divide_size_factors(x=x_sparse, size_factors=self.size_factors)
+        assert isinstance(x_divided, scipy.sparse.csr_matrix)
+        assert np.allclose(x_divided.toarray(), self.x / self.size_factors)
+
+        _, mu_dense, _ = closedform_glm_mean(
+            x=self.x,
+            dmat=self.dmat,
+            constraints=self.constraints,
+            size_factors=self.size_factors
+        )
+        _, mu_sparse, _ = closedform_glm_mean(
+            x=x_sparse,
+            dmat=self.dmat,
+            constraints=self.constraints,
+            size_factors=self.size_factors
+        )
+        assert np.allclose(mu_sparse, mu_dense)
+
+    def test_dask(self):
+        logger.error("TestClosedformGlmMean.test_dask()")
+
+        self.simulate()
+        means_dense, mu_dense, _ = closedform_glm_mean(
+            x=self.x,
+            dmat=self.dmat,
+            constraints=self.constraints
+        )
+        for x in self.dask_inputs():
+            means, mu, _ = closedform_glm_mean(
+                x=x,
+                dmat=self.dmat,
+                constraints=self.constraints
+            )
+            assert np.allclose(means, means_dense)
+            assert np.allclose(mu, mu_dense)
+
+    def test_integer_input(self):
+        logger.error("TestClosedformGlmMean.test_integer_input()")
+
+        # Group sums exceed the int32 range.
+        x = np.full((100000, 2), 30000, dtype=np.int32)
+        dmat = np.ones([100000, 1])
+        for x_i in [x, scipy.sparse.csr_matrix(x), dask.array.from_array(x, chunks=(30000, 2))]:
+            means, _, _ = closedform_glm_mean(
+                x=x_i,
+                dmat=dmat,
+                constraints=np.identity(1)
+            )
+            assert np.allclose(means, 30000)
+
+
+class TestClosedformGlmScale(_TestClosedformGlmAll, unittest.TestCase):
+
+    def test_dask(self):
+        logger.error("TestClosedformGlmScale.test_dask()")
+
+        self.simulate()
+        scales_dense, b_dense, _ = closedform_glm_scale(
+            x=self.x,
+            design_scale=self.dmat,
+            constraints=self.constraints
+        )
+        # Reference: group-wise variances for the groups of the sorted unique design rows.
+        group = self.dmat[:, 1] == 1
+        assert np.allclose(scales_dense, np.vstack([np.var(self.x[~group], axis=0), np.var(self.x[group], axis=0)]))
+        for x in self.dask_inputs() + [scipy.sparse.csr_matrix(self.x)]:
+            scales, b, _ = closedform_glm_scale(
+                x=x,
+                design_scale=self.dmat,
+                constraints=self.constraints
+            )
+            assert np.allclose(scales, scales_dense)
+            assert np.allclose(b, b_dense)
+
+    def test_provided_means(self):
+        logger.error("TestClosedformGlmScale.test_provided_means()")
+
+        self.simulate()
+        means, _, _ = closedform_glm_mean(
+            x=self.x,
+            dmat=self.dmat,
+            constraints=self.constraints
+        )
+        scales_ref, _, _ = closedform_glm_scale(
+            x=self.x,
+            design_scale=self.dmat,
+            constraints=self.constraints
+        )
+        for x in [self.x] + self.dask_inputs():
+            scales, _, _ = closedform_glm_scale(
+                x=x,
+                design_scale=self.dmat,
+                constraints=self.constraints,
+                groupwise_means=means
+            )
+            assert np.allclose(scales, scales_ref)
+
+    def test_integer_input(self):
+        logger.error("TestClosedformGlmScale.test_integer_input()")
+
+        np.random.seed(1)
+        dmat = np.ones([200000, 1])
+        # Group-wise sums of squares exceed the int32 range for moderate counts,
+        # single squares exceed it for large counts.
+        for x in [
+            np.random.poisson(lam=150, size=(200000, 2)).astype(np.int32),
+            np.random.poisson(lam=50000, size=(200000, 2)).astype(np.int32)
+        ]:
+            for x_i in [
+                x,
+                scipy.sparse.csr_matrix(x),
+                dask.array.from_array(x, chunks=(30000, 2)),
+                dask.array.from_array(sparse.COO.from_numpy(x), chunks=(30000, 2), asarray=False)
+            ]:
+                scales, _, _ = closedform_glm_scale(
+                    x=x_i,
+                    design_scale=dmat,
+                    constraints=np.identity(1)
+                )
+                assert np.allclose(scales, np.var(x, axis=0, dtype=np.float64))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import logging
+import numpy as np
+import pandas as pd
+import patsy
+import unittest
+
+import batchglm.api as glm
+
+glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class TestDesignMatrix(unittest.TestCase):
+    """
+    Test design matrix construction from sample descriptions.
+    """
+
+    def test_as_categorical_does_not_modify_input(self):
+        logger.error("TestDesignMatrix.test_as_categorical_does_not_modify_input()")
+
+        sample_description = pd.DataFrame({
+            "condition": np.tile([0, 1], 6),
+            "batch": np.repeat(["1", "2", "3"], 4),
+            "continuous": np.arange(12.)
+        })
+        dtypes = sample_description.dtypes.copy()
+
+        dmat, coef_names = glm.data.design_matrix(
+            sample_description=sample_description,
+            formula="~1+condition+batch+continuous",
+            as_categorical=[True, True, False]
+        )
+        assert coef_names == ["Intercept", "condition[T.1]", "batch[T.2]", "batch[T.3]", "continuous"]
+        assert sample_description.dtypes.equals(dtypes)
+
+    def test_formula_like(self):
+        logger.error("TestDesignMatrix.test_formula_like()")
+
+        sample_description = pd.DataFrame({
+            "condition": np.tile(["a", "b"], 6),
+            "batch": np.repeat(["1", "2", "3"], 4)
+        })
+        formula = "~1+condition+batch"
+        dmat, coef_names = glm.data.design_matrix(sample_description=sample_description, formula=formula)
+        dmat_desc, coef_names_desc = glm.data.design_matrix(
+            sample_description=sample_description,
+            formula=patsy.ModelDesc.from_formula(formula)
+        )
+        assert coef_names == coef_names_desc
+        assert np.array_equal(np.asarray(dmat), np.asarray(dmat_desc))
+
+
+class TestStringConstraintsFromDict(unittest.TestCase):
+    """
+    Test construction of string encoded constraints from grouped factors.
+    """
+
+    def test_nested(self):
+        logger.error("TestStringConstraintsFromDict.test_nested()")
+
+        sample_description = pd.DataFrame({
+            "condition": np.repeat(["a", "b"], 6),
+            "batch": np.repeat(["1", "2", "3", "4"], 3)
+        })
+        constraints = glm.data.string_constraints_from_dict(
+            sample_description=sample_description,
+            constraints={"batch": "condition"}
+        )
+        assert constraints == ["batch[1]+batch[2]=0", "batch[3]+batch[4]=0"]
+
+    def test_not_nested(self):
+        logger.error("TestStringConstraintsFromDict.test_not_nested()")
+
+        sample_description = pd.DataFrame({
+            "condition": np.repeat(["a", "b"], 6),
+            "batch": np.tile(np.repeat(["1", "2", "3"], 2), 2)
+        })
+        with self.assertRaises(AssertionError):
+            glm.data.string_constraints_from_dict(
+                sample_description=sample_description,
+                constraints={"batch": "condition"}
+            )
+
+
+class TestConstraintMatrixFromString(unittest.TestCase):
+    """
+    Test construction of constraint matrices from string encoded equality constraints.
+    """
+
+    def test_rank(self):
+        logger.error("TestConstraintMatrixFromString.test_rank()")
+
+        # Batches 1, 2 belong to condition a, batches 3, 4 to condition b.
+        condition = np.repeat([0., 1.], 6)
+        batch = np.eye(4)[np.repeat([0, 1, 2, 3], 3)]
+        dmat = np.hstack([np.ones([12, 1]), condition[:, None], batch])
+        coef_names = ["Intercept", "condition[T.b]", "batch[1]", "batch[2]", "batch[3]", "batch[4]"]
+        cmat = glm.data.constraint_matrix_from_string(
+            dmat=dmat,
+            coef_names=coef_names,
+            constraints=["batch[1]+batch[2]=0", "batch[3]+batch[4]=0"]
+        )
+        assert cmat.shape == (6, 4)
+
+        # Duplicated column outside of the constraints: the unconstrained sub-design matrix is rank deficient.
+        dmat = np.hstack([dmat, condition[:, None]])
+        with self.assertRaises(ValueError):
+            glm.data.constraint_matrix_from_string(
+                dmat=dmat,
+                coef_names=coef_names + ["condition_duplicate"],
+                constraints=["batch[1]+batch[2]=0", "batch[3]+batch[4]=0"]
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
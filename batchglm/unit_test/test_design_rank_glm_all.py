@@ -0,0 +1,96 @@
+import logging
+import numpy as np
+import unittest
+
+import batchglm.api as glm
+
+glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class TestDesignRankGlmNorm(unittest.TestCase):
+    """
+    Test that estimators reject design matrices that do not identify all model parameters under their constraints.
+    """
+
+    def simulate(self):
+        # Only the design matrices of the simulation are relevant here, the noise model of the data is not.
+        from batchglm.api.models.tf1.glm_nb import Simulator
+
+        self.sim = Simulator(num_observations=1000, num_features=10)
+        self.sim.generate_sample_description(num_batches=2, num_conditions=2)
+        self.sim.generate_params()
+        self.sim.generate_data()
+
+    def get_estimator(self, design, design_names, constraints):
+        from batchglm.api.models.tf1.glm_norm import Estimator, InputDataGLM
+
+        input_data = InputDataGLM(
+            data=self.sim.input_data.x,
+            design_loc=design,
+            design_scale=self.sim.input_data.design_scale,
+            design_loc_names=design_names,
+            design_scale_names=self.sim.input_data.design_scale_names,
+            constraints_loc=constraints,
+            constraints_scale=None,
+            as_dask=False
+        )
+        return Estimator(
+            input_data=input_data,
+            provide_optimizers={
+                "gd": True,
+                "adam": False,
+                "adagrad": False,
+                "rmsprop": False,
+                "nr": False,
+                "nr_tr": False,
+                "irls": False,
+                "irls_gd": False,
+                "irls_tr": False,
+                "irls_gd_tr": False
+            },
+            init_a="standard",
+            init_b="standard"
+        )
+
+    def test_rank_deficient(self):
+        logger.error("TestDesignRankGlmNorm.test_rank_deficient()")
+
+        np.random.seed(1)
+        self.simulate()
+        design_loc = self.sim.input_data.design_loc
+        # Duplicated column: more parameters than the design can identify.
+        dmat = np.hstack([design_loc, design_loc[:, [-1]]])
+        with self.assertRaises(ValueError):
+            self.get_estimator(
+                design=dmat,
+                design_names=list(self.sim.input_data.design_loc_names) + ["duplicate"],
+                constraints=None
+            )
+
+    def test_constrained_vglm(self):
+        logger.error("TestDesignRankGlmNorm.test_constrained_vglm()")
+
+        np.random.seed(1)
+        self.simulate()
+        design_loc = self.sim.input_data.design_loc
+        # Constrained design of test_acc_constrained_vglm_all: rank deficient on its own,
+        # but full rank in the independent parameters defined by the constraints.
+        dmat = np.hstack([
+            design_loc,
+            np.expand_dims(design_loc[:, 0] - design_loc[:, -1], axis=-1)
+        ])
+        constraints = np.zeros([4, 3])
+        constraints[0, 0] = 1
+        constraints[1, 1] = 1
+        constraints[2, 2] = 1
+        constraints[3, 2] = -1
+        self.get_estimator(
+            design=dmat,
+            design_names=['Intercept', 'condition[T.1]', 'batch[1]', 'batch[2]'],
+            constraints=constraints
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import logging
+import numpy as np
+import unittest
+
+import batchglm.api as glm
+from batchglm.utils.linalg import groupwise_solve_lm, unique_rows
+
+glm.setup_logging(verbosity="WARNING", stream="STDOUT")
+logger = logging.getLogger(__name__)
+
+
+class TestUniqueRows(unittest.TestCase):
+    """
+    Test grouping of design matrix rows by unique_rows() against np.unique(..., axis=0).
+    """
+
+    def _test_reconstruct(self, dmat):
+        unique_design, inverse_idx = unique_rows(dmat)
+        assert np.array_equal(unique_design[inverse_idx], dmat, equal_nan=np.issubdtype(dmat.dtype, np.floating))
+        return unique_design, inverse_idx
+
+    def test_float(self):
+        logger.error("TestUniqueRows.test_float()")
+
+        np.random.seed(1)
+        dmat = np.random.randint(0, 3, size=(1000, 4)).astype(float)
+        unique_design, inverse_idx = self._test_reconstruct(dmat)
+        unique_ref, inverse_ref = np.unique(dmat, axis=0, return_inverse=True)
+        assert np.array_equal(unique_design, unique_ref)
+        assert np.array_equal(inverse_idx, inverse_ref.ravel())
+
+    def test_signed_zero(self):
+        logger.error("TestUniqueRows.test_signed_zero()")
+
+        dmat = np.array([[1., 0.], [1., -0.], [1., 1.]])
+        unique_design, inverse_idx = self._test_reconstruct(dmat)
+        assert unique_design.shape[0] == 2
+        assert inverse_idx[0] == inverse_idx[1]
+
+    def test_nan(self):
+        logger.error("TestUniqueRows.test_nan()")
+
+        dmat = np.array([[1., np.nan], [1., 0.], [1., np.nan]])
+        unique_design, inverse_idx = self._test_reconstruct(dmat)
+        assert unique_design.shape[0] == 2
+        assert inverse_idx[0] == inverse_idx[2]
+
+    def test_int_and_bool(self):
+        logger.error("TestUniqueRows.test_int_and_bool()")
+
+        np.random.seed(1)
+        for dmat in [
+            np.random.randint(0, 3, size=(100, 3)),
+            np.random.randint(0, 2, size=(100, 3)).astype(bool)
+        ]:
+            unique_design, _ = self._test_reconstruct(dmat)
+            assert unique_design.dtype == dmat.dtype
+            assert np.array_equal(unique_design, np.unique(dmat, axis=0))
+
+
+class TestGroupwiseSolveLm(unittest.TestCase):
+    """
+    Test that groupwise_solve_lm() labels groups by sorted unique design rows.
+    """
+
+    def test_group_order(self):
+        logger.error("TestGroupwiseSolveLm.test_group_order()")
+
+        dmat = np.array([[1., 1.], [1., 0.], [1., 1.], [1., 0.]])
+        params, x_prime, _, _, _ = groupwise_solve_lm(
+            dmat=dmat,
+            apply_fun=lambda grouping: np.expand_dims(np.bincount(grouping, weights=np.arange(4.)), axis=-1),
+            constraints=np.identity(2)
+        )
+        # Group 0 is design row [1, 0] (observations 1 and 3), group 1 is [1, 1] (observations 0 and 2).
+        assert np.allclose(params[:, 0], [4., 2.])
+        assert np.allclose(x_prime[:, 0], [4., -2.])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 import dask.array
 import numpy as np
+import pandas as pd
 
 import logging
 
@@ -33,6 +34,31 @@ def stacked_lstsq(L, b, rcond=1e-10):
     return np.conj(x, out=x)
 
 
+def unique_rows(dmat: np.ndarray):
+    r"""
+    Find the unique rows of a matrix and the assignment of each row to them.
+
+    Rows are grouped by hashing their raw bytes, which is a single linear pass over the matrix instead of
+    the lexicographic sort of all rows performed by `np.unique(..., axis=0)`. Only the unique rows are sorted
+    afterwards, so that the output matches the order of `np.unique(..., axis=0)`.
+
+    :param dmat: matrix (observations x parameters), e.g. a design matrix
+    :return: tuple of (unique_rows, inverse_idx) where `unique_rows[inverse_idx]` reconstructs `dmat`.
+    """
+    dmat = np.ascontiguousarray(dmat)
+    if np.issubdtype(dmat.dtype, np.floating):
+        # Adding zero maps -0. to 0. so that both end up in the same group.
+        dmat = dmat + 0.
+    row_keys = dmat.view(np.dtype((np.void, dmat.dtype.itemsize * dmat.shape[1]))).ravel()
+    inverse_idx, unique_keys = pd.factorize(row_keys)
+    unique_design = np.frombuffer(unique_keys.tobytes(), dtype=dmat.dtype).reshape(-1, dmat.shape[1])
+    # Sort unique rows lexicographically with the first column as primary key and relabel the groups.
+    order = np.lexsort(unique_design.T[::-1])
+    relabel = np.empty_like(order)
+    relabel[order] = np.arange(order.shape[0])
+    return unique_design[order], relabel[inverse_idx]
+
+
 def groupwise_solve_lm(
         dmat,
         apply_fun: callable,
@@ -69,14 +95,15 @@ def groupwise_solve_lm(
         This form of constraints is used in vector generalized linear models (VGLMs).
 
     :return: tuple of (apply_fun(grouping), x_prime, rmsd, rank, s) where x_prime is the parameter matrix solved for
-    `dmat`.
+    `dmat`. Groups are labeled, and rows of apply_fun(grouping) are ordered, by the lexicographically sorted unique
+    rows of `dmat` as returned by `np.unique(dmat, axis=0)`.
     """
     # Get unqiue rows of design matrix and vector with group assignments:
-    if isinstance(dmat, dask.array.core.Array):  # axis argument not supported by dask in .unique()
-        unique_design, inverse_idx = np.unique(dmat.compute(), axis=0, return_inverse=True)
+    if isinstance(dmat, dask.array.core.Array):  # row hashing requires an in-memory array
+        unique_design, inverse_idx = unique_rows(dmat.compute())
         unique_design = dask.array.from_array(unique_design, chunks=unique_design.shape)
     else:
-        unique_design, inverse_idx = np.unique(dmat, axis=0, return_inverse=True)
+        unique_design, inverse_idx = unique_rows(np.asarray(dmat))
     if unique_design.shape[0] > 500:
         raise ValueError("large least-square problem in init, likely defined a numeric predictor as categorical")
 